@@ -1,3 +1,4 @@
+import math
 import simpy
 
 # --- basic commands and toolbox function ---
@@ -28,9 +29,17 @@ import simpy
 def tank_fill(env, tank, amount):
     print(f"[{env.now:5.2f}] FILL : Filling tank with {amount}L/h")
     tank.status = "Filling"
-    while tank.level < tank.capacity:
+    # The first hour is stepped as before, which puts this process behind the reporter
+    # from then on; the rest runs at a constant rate, so wait it out in one go
+    if tank.level < tank.capacity:
         yield env.timeout(1)
         yield tank.put(amount)
+    hours = -(-(tank.capacity - tank.level) // amount)
+    if hours > 0:
+        tank.flow = (env.now, tank.level, amount)
+        yield env.timeout(hours)
+        yield tank.put(hours * amount)
+        tank.flow = None
 
     print(f"[{env.now:5.2f}] FILL : Tank is full at {tank.level}L")
 
@@ -38,12 +47,32 @@ def tank_fill(env, tank, amount):
 def tank_empty(env, tank, amount):
     print(f"[{env.now:5.2f}] EMPTY : Emptying tank with {amount}L/h")
     tank.status = "Emptying"
-    while tank.level >= amount:
+    # Same as the fill: one stepped hour, then every remaining whole hour in one go
+    # (anything below one hour's worth stays in the tank)
+    if tank.level >= amount:
         yield env.timeout(1)
         yield tank.get(amount)
+    hours = tank.level // amount
+    if hours > 0:
+        tank.flow = (env.now, tank.level, -amount)
+        yield env.timeout(hours)
+        yield tank.get(hours * amount)
+        tank.flow = None
 
     print(f"[{env.now:5.2f}] EMPTY : Tank is empty at {tank.level}L")
 
+
+def current_level(env, tank):
+    """
+    Level right now while a fill or empty is still running.
+    Each hourly step lands just after the reporter's sample at that hour,
+    so only the steps before the current hour count.
+    """
+    if tank.flow is None:
+        return tank.level
+    start_time, start_level, rate = tank.flow
+    return start_level + rate * max(math.ceil(env.now - start_time) - 1, 0)
+
 def process_flow(env, tank):
     print(f"[{env.now:5.2f}] PROCESS : Starting process")
     tank.status = "Processing"
@@ -64,7 +93,7 @@ def reporter(env, tank):
     # Run forever
     while tank.status != "Idle":
         # Print current status
-        print(f"[{env.now:5.2f}] REPORT : {tank.name} is {tank.status}, level is {tank.level}L")
+        print(f"[{env.now:5.2f}] REPORT : {tank.name} is {tank.status}, level is {current_level(env, tank)}L")
         
         # Wait 2 hours before checking again
         yield env.timeout(1)
@@ -80,6 +109,7 @@ env = simpy.Environment()
 
 tank1 = simpy.Container(env, capacity=130, init=0)
 tank1.name = "Media Tank"
+tank1.flow = None # (start time, start level, rate) while filling or emptying
 
 
 # --- run process ---
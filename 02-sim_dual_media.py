@@ -1,48 +1,75 @@
 import simpy
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+from sim_utils import (ColumnarLogger, minmax_buckets, simulate_perfusion, steps_post,
+                       EVENT_START, EVENT_SWITCH, EVENT_ALARM, EVENT_MEDIA, EVENT_REFILLED)
 
 # --- CONFIGURATION ---
 TANK_CAPACITY = 100.0    # Liters
+PRODUCT_CAPACITY = 1000  # Liters
+WASTE_CAPACITY = 10000   # Liters
 BIOREACTOR_FLOW = 2.0    # Liters per hour
 CLEANING_TIME = 4.0      # Hours to clean a tank
 FILLING_TIME = 2.0       # Hours to make media and fill tank
 SIM_DURATION = 1500       # Hours
+REPORT_INTERVAL = 1.0    # Hours between data log samples
+USE_KERNEL = True        # Run the schedule with simulate_perfusion (same log and chart) instead of the SimPy processes
+MAX_PLOT_POINTS = 2000   # Each chart series is downsampled (min/max per bucket) to at most this many points
 
 # --- SHARED STATE ---
-# This dictionary acts as the "brain" that all functions can see
-system_state = {
-    "active_tank_name": "MT1" # Starts consuming from MT1
+# This class acts as the "brain" that all functions can see
+# (plain class attributes: no dict lookup on every read)
+class State:
+    active = "MT1"    # Starts consuming from MT1
+
+# Columns of the data log; the active tank is logged as a small integer code
+LOG_SCHEMA = {
+    "Time": np.float64,
+    "MT1_Level": np.float32,
+    "MT2_Level": np.float32,
+    "Product_Vol": np.float32,
+    "Waste_Vol": np.float32,
+    "Active_Tank": np.int8,
 }
+TANK_CODES = {"MT1": 0, "MT2": 1}
 
 # --- PROCESS 1: THE BIOREACTOR (CONSUMER) ---
 def bioreactor_process(env, tanks, product_tank, waste_tank):
     print(f"[{env.now:5.1f}] BIO   : Production Started")
+    tank_mt1, tank_mt2 = tanks["MT1"], tanks["MT2"]
+
+    # Bind what the hourly loop calls to locals once
+    timeout = env.timeout
+    put_product, put_waste = product_tank.put, waste_tank.put
+    
+    # PERFUSION SPLIT (ATF): 5% to Product, 95% to Waste
+    to_product = BIOREACTOR_FLOW * 0.05
+    to_waste = BIOREACTOR_FLOW * 0.95
     
     while env.now <= SIM_DURATION:
         # 1. Identify which tank is currently active
-        active_name = system_state["active_tank_name"]
-        active_tank = tanks[active_name]
+        active_name = State.active
+        active_tank = tank_mt1 if active_name == "MT1" else tank_mt2
         
         # 2. CHECK FOR SWITCH
         # If active tank doesn't have enough for the next hour, switch!
         if active_tank.level < BIOREACTOR_FLOW:
             print(f"[{env.now:5.1f}] SWITCH: {active_name} is empty! Switching tanks.")
             
-            # Toggle the name
+            # Toggle the name and update our local variables to the new tank
             if active_name == "MT1":
-                system_state["active_tank_name"] = "MT2"
+                active_name, active_tank = "MT2", tank_mt2
             else:
-                system_state["active_tank_name"] = "MT1"
-            
-            # Update our local variable to the new tank
-            active_name = system_state["active_tank_name"]
-            active_tank = tanks[active_name]
+                active_name, active_tank = "MT1", tank_mt1
+            State.active = active_name
             
             print(f"[{env.now:5.1f}] SWITCH: New Active Tank is {active_name} (Level: {active_tank.level}L)")
 
         # 3. CONSUME (Wait 1 hour for the flow)
-        yield env.timeout(1)
+        yield timeout(1)
         
         # Take media from the active tank
         # We use Try/Except just in case we run out completely
@@ -50,12 +77,8 @@ def bioreactor_process(env, tanks, product_tank, waste_tank):
             yield active_tank.get(BIOREACTOR_FLOW)
             
             # 4. PERFUSION SPLIT (ATF)
-            # 5% to Product, 95% to Waste
-            to_product = BIOREACTOR_FLOW * 0.05
-            to_waste = BIOREACTOR_FLOW * 0.95
-            
-            yield product_tank.put(to_product)
-            yield waste_tank.put(to_waste)
+            yield put_product(to_product)
+            yield put_waste(to_waste)
         else:
             print(f"[{env.now:5.1f}] ALARM : CRITICAL - BOTH TANKS EMPTY! Process Paused.")
 
@@ -68,7 +91,7 @@ def media_refiller_process(env, tanks):
         for name, tank in tanks.items():
             
             # Logic: If tank is empty AND it is NOT the one being used
-            is_idle = (name != system_state["active_tank_name"])
+            is_idle = (name != State.active)
             is_empty = (tank.level < 1.0) # virtually empty
             
             if is_idle and is_empty:
@@ -89,21 +112,28 @@ def media_refiller_process(env, tanks):
 
 # --- PROCESS 3: THE REPORTER (DATA LOGGING) ---
 def reporter_process(env, tanks, product_tank, waste_tank, data_log):
+    last = None
     while env.now <= SIM_DURATION:
-        # Record current state
-        data_log.append({
-            "Time": env.now,
-            "MT1_Level": tanks['MT1'].level,
-            "MT2_Level": tanks['MT2'].level,
-            "Product_Vol": product_tank.level,
-            "Waste_Vol": waste_tank.level,
-            "Active_Tank": system_state["active_tank_name"]
-        })
-        # Wait 1 hour
-        yield env.timeout(1)
-
-
+        mt1, mt2 = tanks['MT1'].level, tanks['MT2'].level
+        prod, waste = product_tank.level, waste_tank.level
+        active = TANK_CODES[State.active]
 
+        # Record current state, but only if something changed since the last row
+        # (the chart draws steps, so a skipped row just extends the previous one)
+        if (last is None or active != last[4]
+                or abs(mt1 - last[0]) >= 1e-9 or abs(mt2 - last[1]) >= 1e-9
+                or abs(prod - last[2]) >= 1e-9 or abs(waste - last[3]) >= 1e-9):
+            data_log.append(
+                Time=env.now,
+                MT1_Level=mt1,
+                MT2_Level=mt2,
+                Product_Vol=prod,
+                Waste_Vol=waste,
+                Active_Tank=active,
+            )
+            last = (mt1, mt2, prod, waste, active)
+        # Wait for the next sample
+        yield env.timeout(REPORT_INTERVAL)
 
 
 
@@ -114,88 +144,109 @@ def reporter_process(env, tanks, product_tank, waste_tank, data_log):
 
 
 
-# --- MAIN EXECUTION ---
-
-# 1. Setup Environment
-env = simpy.Environment()
-
-
-
-
-
-
-
-
-
-
-# 2. Create Objects
-# MT1 starts full, MT2 starts empty (to test refill logic immediately)
-tanks = {
-    "MT1": simpy.Container(env, capacity=TANK_CAPACITY, init=TANK_CAPACITY),
-    "MT2": simpy.Container(env, capacity=TANK_CAPACITY, init=0)
-}
-product_tank = simpy.Container(env, capacity=1000, init=0)
-waste_tank = simpy.Container(env, capacity=10000, init=0)
-
-# List to store data for charts
-data_log = []
-
 
 
 
+# --- SIMULATION RUNS ---
 
+def run_simpy():
+    """Runs the three processes in SimPy and returns the data log as a DataFrame."""
+    # 1. Setup Environment
+    env = simpy.Environment()
 
+    # 2. Create Objects
+    # MT1 starts full, MT2 starts empty (to test refill logic immediately)
+    tanks = {
+        "MT1": simpy.Container(env, capacity=TANK_CAPACITY, init=TANK_CAPACITY),
+        "MT2": simpy.Container(env, capacity=TANK_CAPACITY, init=0.0)
+    }
+    product_tank = simpy.Container(env, capacity=PRODUCT_CAPACITY, init=0)
+    waste_tank = simpy.Container(env, capacity=WASTE_CAPACITY, init=0)
 
+    # Data for charts, sized up front for one row per reporter tick
+    data_log = ColumnarLogger(LOG_SCHEMA, capacity=int(SIM_DURATION / REPORT_INTERVAL) + 1)
 
+    # 3. Add Processes
+    env.process(bioreactor_process(env, tanks, product_tank, waste_tank))
+    env.process(media_refiller_process(env, tanks))
+    env.process(reporter_process(env, tanks, product_tank, waste_tank, data_log))
 
+    # 4. Run
+    env.run(until=SIM_DURATION)
+    return data_log.to_df()
 
-# 3. Add Processes
-env.process(bioreactor_process(env, tanks, product_tank, waste_tank))
-env.process(media_refiller_process(env, tanks))
-env.process(reporter_process(env, tanks, product_tank, waste_tank, data_log))
 
+def print_events(events):
+    """Prints simulate_perfusion's event log with the lines the SimPy processes print."""
+    names = list(TANK_CODES)
+    for now, code, tank, level in events:
+        name = names[int(tank)]
+        if code == EVENT_START:
+            print(f"[{now:5.1f}] BIO   : Production Started")
+        elif code == EVENT_SWITCH:
+            print(f"[{now:5.1f}] SWITCH: {name} is empty! Switching tanks.")
+            print(f"[{now:5.1f}] SWITCH: New Active Tank is {names[1 - int(tank)]} (Level: {level}L)")
+        elif code == EVENT_ALARM:
+            print(f"[{now:5.1f}] ALARM : CRITICAL - BOTH TANKS EMPTY! Process Paused.")
+        elif code == EVENT_MEDIA:
+            print(f"[{now:5.1f}] MEDIA : {name} is empty and idle. Starting Clean & Refill.")
+        elif code == EVENT_REFILLED:
+            print(f"[{now:5.1f}] MEDIA : {name} Refilled to {level}L. Ready.")
 
 
+def run_kernel():
+    """Computes the same run with simulate_perfusion, prints its event log and returns the samples as a DataFrame."""
+    trajectory, events = simulate_perfusion(TANK_CAPACITY, BIOREACTOR_FLOW, CLEANING_TIME, FILLING_TIME, SIM_DURATION,
+                                            PRODUCT_CAPACITY, WASTE_CAPACITY, REPORT_INTERVAL)
+    print_events(events)
+    return pd.DataFrame(dict(zip(LOG_SCHEMA, trajectory))).astype(LOG_SCHEMA)
 
 
+# --- MAIN EXECUTION ---
 
-
-
-
-
-# 4. Run
-print("--- Simulation Start ---")
-env.run(until=SIM_DURATION)
-print("--- Simulation End ---")
-
-
-
-
-
-
-
-
-
-
-
-# --- VISUALIZATION (Matplotlib) ---
-print("\nGenerating Chart...")
-df = pd.DataFrame(data_log)
-
-plt.figure(figsize=(12, 6))
-
-# Plot Media Tanks
-plt.plot(df['Time'], df['MT1_Level'], label='Media Tank 1', color='blue')
-plt.plot(df['Time'], df['MT2_Level'], label='Media Tank 2', color='cyan', linestyle="--")
-
-# Plot Product (Multiplied by 10 just to make it visible on the same scale)
-plt.plot(df['Time'], df['Product_Vol'], label='Product (Accumulated)', color='green', linewidth=2)
-
-# Formatting
-plt.title('Perfusion Process: Swing Tank Switching')
-plt.xlabel('Time (hours)')
-plt.ylabel('Volume (L)')
-plt.axhline(y=0, color='black', linewidth=0.5)
-plt.legend()
-plt.grid(True, alpha=0.3)
-plt.show()
\ No newline at end of file
+if __name__ == "__main__":
+    print("--- Simulation Start ---")
+    df = run_kernel() if USE_KERNEL else run_simpy()
+    print("--- Simulation End ---")
+
+    # --- VISUALIZATION (Matplotlib) ---
+    print("\nGenerating Chart...")
+    # Tank codes back to names, kept as a two-category column rather than object strings
+    df['Active_Tank'] = pd.Categorical.from_codes(df['Active_Tank'], categories=list(TANK_CODES))
+
+    plt.figure(figsize=(12, 6))
+
+    # Series to plot: (column, label, color, linestyle, linewidth)
+    series = [
+        ('MT1_Level', 'Media Tank 1', 'blue', '-', 1.5),
+        ('MT2_Level', 'Media Tank 2', 'cyan', '--', 1.5),
+        ('Product_Vol', 'Product (Accumulated)', 'green', '-', 2),
+    ]
+
+    # Plot Media Tanks and Product as one collection (a single draw call),
+    # each series downsampled so the drawing cost doesn't grow with SIM_DURATION
+    # and drawn as steps: a level holds until the next logged row
+    t = df['Time'].to_numpy(dtype=np.float64)
+    y = np.column_stack([df[column].to_numpy(dtype=np.float64) for column, *_ in series])
+    segments = []
+    for i in range(len(series)):
+        keep = minmax_buckets(y[:, i], MAX_PLOT_POINTS)
+        segments.append(steps_post(t[keep], y[keep, i], SIM_DURATION))
+    lines = LineCollection(
+        segments,
+        colors=[color for _, _, color, _, _ in series],
+        linestyles=[style for _, _, _, style, _ in series],
+        linewidths=[width for *_, width in series],
+    )
+    plt.gca().add_collection(lines)
+    plt.gca().autoscale()
+
+    # Formatting
+    plt.title('Perfusion Process: Swing Tank Switching')
+    plt.xlabel('Time (hours)')
+    plt.ylabel('Volume (L)')
+    plt.axhline(y=0, color='black', linewidth=0.5)
+    plt.legend(handles=[Line2D([], [], color=color, linestyle=style, linewidth=width, label=label)
+                        for _, label, color, style, width in series])
+    plt.grid(True, alpha=0.3)
+    plt.show()
\ No newline at end of file
@@ -1,7 +1,15 @@
 import simpy
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from sim_utils import ColumnarLogger, lttb, resample, status_histogram
+
+# Status is logged as a small integer code instead of a string
+STATUS_NAMES = ["Idle", "Filling", "Emptying"]
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+HISTORY_SCHEMA = {"Time": np.float64, "Level": np.float64, "Status": np.int8}
+
 
 class Tank:
     def __init__(self, env, dt, name, capacity, initial_level=0):
@@ -13,25 +21,38 @@ class Tank:
         # The "Engine" is hidden inside the class
         self.container = simpy.Container(env, capacity=capacity, init=initial_level)
 
+        # (time, level, status code) at every status change; the reporter
+        # interpolates between these instead of polling every dt
+        self.history = ColumnarLogger(HISTORY_SCHEMA, capacity=16)
+        self._record()
+
+
+    def _record(self):
+        self.history.append(Time=self.env.now, Level=self.container.level, Status=STATUS_CODES[self.status])
 
     def fill_to_level(self, target_level, rate):
         print(f"[{self.env.now:5.2f}] {self.name} : Filling to {target_level}L at {rate}L/h")
         self.status = "Filling"
-        while self.container.level < target_level:
-            yield self.env.timeout(self.dt)
-            space_available = self.container.capacity - self.container.level
-            yield self.container.put(min(rate*self.dt, space_available))
+        self._record()
+        # The rate is constant, so the whole fill is one timeout plus one bulk put
+        needed = min(target_level, self.container.capacity) - self.container.level
+        if needed > 0:
+            yield self.env.timeout(needed / rate)
+            yield self.container.put(needed)
         self.status = "Idle"
+        self._record()
         print(f"[{self.env.now:5.2f}] {self.name} : Filled to {self.container.level}L")
 
     def empty_to_level(self, target_level, rate):
         print(f"[{self.env.now:5.2f}] {self.name} : Emptying to {target_level}L at {rate}L/h")
         self.status = "Emptying"
-        while self.container.level > target_level:
-            yield self.env.timeout(self.dt)
-            remaining_volume = self.container.level - target_level
-            yield self.container.get(min(rate*self.dt, remaining_volume))
+        self._record()
+        needed = self.container.level - target_level
+        if needed > 0:
+            yield self.env.timeout(needed / rate)
+            yield self.container.get(needed)
         self.status = "Idle"
+        self._record()
         print(f"[{self.env.now:5.2f}] {self.name} : Emptied to {self.container.level}L")
 
 
@@ -48,19 +69,19 @@ def main_process(env, tank):
 
 
 
-def reporter_process(env, tank, data_log):
+def sample_history(tank, sample_times):
+    """Replays the tank's recorded transitions onto a uniform time grid."""
+    times, codes = tank.history.column("Time"), tank.history.column("Status")
+    # Levels change linearly between transitions, status holds until the next one
+    sampled_levels = resample(times, tank.history.column("Level"), sample_times)
+    sampled_codes = codes[np.searchsorted(times, sample_times, side='right') - 1]
+    return sampled_levels, sampled_codes
 
-    while True:
 
-        yield env.timeout(tank.dt)
-        bar = "|" * int(tank.container.level / 10)
-        print(f"   [REPORT] {tank.name} [{tank.status:^10}] : {tank.container.level:5.1f}L {bar}")
-        data_log.append({
-            "Time": env.now,
-            "Tank": tank.name,
-            "Level": tank.container.level,
-            "Status": tank.status
-        })
+def reporter(tank, sample_times, levels, codes):
+    for now, level, code in zip(sample_times, levels, codes):
+        bar = "|" * int(level / 10)
+        print(f"   [REPORT] {tank.name} [{STATUS_NAMES[code]:^10}] : {level:5.1f}L {bar}")
 
 
 # --- MAIN EXECUTION ---
@@ -68,16 +89,20 @@ def reporter_process(env, tank, data_log):
 env = simpy.Environment()
 SIM_DURATION = 30
 DT = 0.1
-data_log = []
+MAX_PLOT_POINTS = 2000  # The level chart is downsampled (LTTB) to at most this many points
 
 print("Starting simulation...")
 tank = Tank(env, DT, "Tank1", 100, 0)
 
 env.process(main_process(env, tank))
-env.process(reporter_process(env, tank, data_log))
 
 env.run(until=SIM_DURATION)
 
+# Sample the run once at the end instead of polling it every dt
+sample_times = np.arange(0, SIM_DURATION, DT)
+levels, codes = sample_history(tank, sample_times)
+reporter(tank, sample_times, levels, codes)
+
 print("Simulation completed.")
 
 
@@ -92,16 +117,22 @@ print("Simulation completed.")
 
 # --- REPORTING AND VISUALIZATION ---
 
-df = pd.DataFrame(data_log)
+df = pd.DataFrame({
+    "Time": sample_times,
+    "Tank": tank.name,
+    "Level": levels.astype(np.float32),
+    "Status": pd.Categorical.from_codes(codes, categories=STATUS_NAMES),
+})
 
 # Create figure with two subplots
 fig = plt.figure(figsize=(14, 10))
 
 # --- SUBPLOT 1: Tank Content Chart ---
 ax1 = plt.subplot(2, 1, 1)
-ax1.plot(df['Time'], df['Level'], linewidth=2.5, color='#2E86AB', label='Tank Level')
+plot_df = df.iloc[lttb(sample_times, levels, MAX_PLOT_POINTS)]
+ax1.plot(plot_df['Time'], plot_df['Level'], linewidth=2.5, color='#2E86AB', label='Tank Level')
 ax1.axhline(y=tank.container.capacity, color='r', linestyle='--', linewidth=1, alpha=0.5, label='Capacity')
-ax1.fill_between(df['Time'], df['Level'], alpha=0.3, color='#2E86AB')
+ax1.fill_between(plot_df['Time'], plot_df['Level'], alpha=0.3, color='#2E86AB')
 ax1.set_xlabel('Time (hours)', fontsize=11, fontweight='bold')
 ax1.set_ylabel('Volume (L)', fontsize=11, fontweight='bold')
 ax1.set_title(f'Tank Content Over Time - {tank.name}', fontsize=13, fontweight='bold', pad=15)
@@ -120,51 +151,34 @@ status_colors = {
 }
 
 # Process data_log to identify status transitions for Gantt chart
-# Group by status and find continuous periods
-status_periods = []
-current_status = None
-period_start = None
-
-for idx, row in df.iterrows():
-    if current_status != row['Status']:
-        # Status changed - end previous period and start new one
-        if current_status is not None and period_start is not None:
-            status_periods.append({
-                'start': period_start,
-                'end': row['Time'],
-                'status': current_status
-            })
-        current_status = row['Status']
-        period_start = row['Time']
-
-# Add the last period
-if current_status is not None and period_start is not None:
-    status_periods.append({
-        'start': period_start,
-        'end': df['Time'].iloc[-1],
-        'status': current_status
-    })
+# A period starts wherever the status code differs from the previous sample
+# and ends where the next period starts (or at the last sample)
+status_codes = df['Status'].cat.codes.to_numpy()
+times = df['Time'].to_numpy()
+changes = np.flatnonzero(status_codes[1:] != status_codes[:-1]) + 1
+starts = np.r_[0, changes]
+ends = np.r_[changes, len(status_codes) - 1]
+
+period_codes = status_codes[starts]
+period_starts = times[starts]
+period_durations = times[ends] - period_starts
 
 # Build Gantt chart
 y_pos = 0  # Single row for this tank
 bar_height = 0.6
 
-for period in status_periods:
-    start_time = period['start']
-    end_time = period['end']
-    status = period['status']
-    duration = end_time - start_time
-    
-    color = status_colors.get(status, '#95A5A6')
-    
-    # Draw the bar
-    ax2.barh(y_pos, duration, left=start_time, height=bar_height, 
-             color=color, edgecolor='black', linewidth=1.5, alpha=0.8)
-    
-    # Add label in the middle of the bar if it's wide enough
-    if duration > 0.5:  # Only label if bar is wide enough
-        mid_time = start_time + duration / 2
-        ax2.text(mid_time, y_pos, status, ha='center', va='center', 
+# One broken_barh per status draws all of its periods as a single collection
+for status, color in status_colors.items():
+    in_status = period_codes == STATUS_CODES[status]
+    if in_status.any():
+        ax2.broken_barh(list(zip(period_starts[in_status], period_durations[in_status])),
+                        (y_pos - bar_height / 2, bar_height),
+                        facecolors=color, edgecolor='black', linewidth=1.5, alpha=0.8)
+
+# Add label in the middle of each bar that is wide enough
+for start_time, duration, code in zip(period_starts, period_durations, period_codes):
+    if duration > 0.5:
+        ax2.text(start_time + duration / 2, y_pos, STATUS_NAMES[code], ha='center', va='center', 
                 fontweight='bold', fontsize=10, color='white')
 
 # Format Gantt chart
@@ -193,8 +207,11 @@ print(f"Final Tank Level: {df['Level'].iloc[-1]:.2f} L")
 print(f"Maximum Tank Level: {df['Level'].max():.2f} L")
 print(f"Minimum Tank Level: {df['Level'].min():.2f} L")
 print("\nStatus Summary:")
-status_counts = df['Status'].value_counts()
-for status, count in status_counts.items():
+status_counts = status_histogram(codes, len(STATUS_NAMES))
+for code in np.argsort(-status_counts, kind='stable'):
+    status, count = STATUS_NAMES[code], status_counts[code]
+    if count == 0:
+        continue
     duration = count * tank.dt
     percentage = (duration / df['Time'].max()) * 100
     print(f"  {status:10s}: {duration:6.2f} hours ({percentage:5.1f}%)")
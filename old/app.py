@@ -1,80 +1,83 @@
 import streamlit as st
 import yaml
 from streamlit_agraph import agraph
-from schema import RecipeConfig
+from schema import RecipeConfig, RECIPE_ADAPTER, YamlLoader
 from viz import render_process_map
 import io
-import sys
+import contextlib
+import logging
 from engine import SimulationEngine, Batch
-from units import MediaPrep, Fermentation, Chromatography
+from units import build_steps, log as units_log
 import simpy
 
 st.set_page_config(layout="wide", page_title="Pharma Process Simulator")
 
+@st.cache_data(show_spinner=False)
+def parse_config(config_yaml_str: str) -> RecipeConfig:
+    """Parses and validates the recipe; cached on the YAML text across reruns."""
+    return RECIPE_ADAPTER.validate_python(yaml.load(config_yaml_str, Loader=YamlLoader))
+
 def run_sim_logic(config_yaml_str):
     try:
-        data = yaml.safe_load(config_yaml_str)
-        config = RecipeConfig(**data)
+        config = parse_config(config_yaml_str)
     except Exception as e:
         return None, f"Error parsing YAML: {e}"
 
-    old_stdout = sys.stdout
-    sys.stdout = mystdout = io.StringIO()
-
-    try:
-        engine = SimulationEngine()
-        bioreactor = simpy.Resource(engine.env, capacity=1)
-        chromatography_skids = simpy.Resource(engine.env, capacity=config.resources.chromatography_skids)
-        batch = Batch(id="Batch-001", volume_liters=config.resources.bioreactor_volume)
+    mystdout = io.StringIO()
+    # The unit operations' step log goes to the same buffer as the printed report
+    log_handler = logging.StreamHandler(mystdout)
+    previous_level = units_log.level
+    with contextlib.redirect_stdout(mystdout):
+        try:
+            units_log.addHandler(log_handler)
+            units_log.setLevel(logging.DEBUG)
+            engine = SimulationEngine()
+            bioreactor = simpy.Resource(engine.env, capacity=1)
+            chromatography_skids = simpy.Resource(engine.env, capacity=config.resources.chromatography_skids)
+            batch = Batch(id="Batch-001", volume_liters=config.resources.bioreactor_volume)
         
-        print(f"Starting Simulation with Batch Size: {batch.volume_liters}L")
+            print(f"Starting Simulation with Batch Size: {batch.volume_liters}L")
 
-        def process_flow():
-            for step_config in config.steps:
-                step_type = step_config.type
-                if step_type == "MediaPrep":
-                    step = MediaPrep(engine.env, step_config)
-                    yield from step.run(batch)
-                elif step_type == "Fermentation":
-                    step = Fermentation(engine.env, step_config, resource=bioreactor)
-                    yield from step.run(batch)
-                elif step_type == "Chromatography":
-                    step = Chromatography(engine.env, step_config, resource=chromatography_skids)
+            steps = build_steps(config, engine.env, bioreactor, chromatography_skids)
+
+            def process_flow():
+                for step in steps:
                     yield from step.run(batch)
                 
-                if batch.volume_liters == 0:
-                    print("Batch failed/terminated.")
-                    break
+                    if batch.volume_liters == 0:
+                        print("Batch failed/terminated.")
+                        break
             
-            engine.materials_manager.add_product(batch.product_mass_grams)
+                engine.materials_manager.add_product(batch.product_mass_grams)
         
-        engine.env.process(process_flow())
-        engine.run()
+            engine.env.process(process_flow())
+            engine.run()
         
-        summary = engine.materials_manager.get_summary()
-        print("\n" + "="*30)
-        print("       SIMULATION REPORT       ")
-        print("="*30)
-        print(f"Total Process Time:     {engine.now:.2f} hours")
-        print(f"Total Product Produced: {summary['total_product_grams']:.2f} g")
-        print("-" * 30)
-        print("Inventory Consumed:")
-        for item, amount in summary['inventory_consumed'].items():
-            print(f"  - {item}: {amount}")
-        print("-" * 30)
-        print("Waste Produced:")
-        if not summary['waste_produced']:
-            print("  None")
-        else:
-            for item, amount in summary['waste_produced'].items():
+            summary = engine.materials_manager.get_summary()
+            print("\n" + "="*30)
+            print("       SIMULATION REPORT       ")
+            print("="*30)
+            print(f"Total Process Time:     {engine.now:.2f} hours")
+            print(f"Total Product Produced: {summary['total_product_grams']:.2f} g")
+            print("-" * 30)
+            print("Inventory Consumed:")
+            for item, amount in summary['inventory_consumed'].items():
                 print(f"  - {item}: {amount}")
-        print("="*30)
+            print("-" * 30)
+            print("Waste Produced:")
+            if not summary['waste_produced']:
+                print("  None")
+            else:
+                for item, amount in summary['waste_produced'].items():
+                    print(f"  - {item}: {amount}")
+            print("="*30)
+
+        except Exception as e:
+            print(f"Simulation Error: {e}")
+        finally:
+            units_log.removeHandler(log_handler)
+            units_log.setLevel(previous_level)
 
-    except Exception as e:
-        print(f"Simulation Error: {e}")
-    finally:
-        sys.stdout = old_stdout
-        
     return mystdout.getvalue(), None
 
 st.sidebar.title("Process Configuration")
@@ -93,8 +96,7 @@ tab1, tab2 = st.tabs(["Process Map", "Simulation Results"])
 with tab1:
     if yaml_content:
         try:
-            data = yaml.safe_load(yaml_content)
-            config = RecipeConfig(**data)
+            config = parse_config(yaml_content)
             
             nodes, edges, config_obj = render_process_map(config)
             
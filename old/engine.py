@@ -1,5 +1,7 @@
 import simpy
-from typing import Dict, List
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional
 from dataclasses import dataclass, field
 
 @dataclass
@@ -15,28 +17,23 @@ class Batch:
         self.history.append(message)
 
 class MaterialsManager:
-    """Singleton-like class to track global inventory and waste."""
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MaterialsManager, cls).__new__(cls)
-            cls._instance.reset()
-        return cls._instance
+    """Tracks global inventory and waste. Use the shared MATERIALS instance."""
+    def __init__(self):
+        self.reset()
 
     def reset(self):
-        self.inventory: Dict[str, float] = {}
-        self.waste: Dict[str, float] = {}
+        self.inventory: Dict[str, float] = Counter()
+        self.waste: Dict[str, float] = Counter()
         self.product_produced: float = 0.0
 
     def consume(self, material: str, amount: float):
-        if material not in self.inventory:
-            self.inventory[material] = 0.0
         self.inventory[material] += amount
 
+    def consume_bulk(self, materials: Dict[str, float]):
+        """Consume several materials in one call (e.g. a step's consumables)."""
+        self.inventory.update(materials)
+
     def add_waste(self, waste_type: str, amount: float):
-        if waste_type not in self.waste:
-            self.waste[waste_type] = 0.0
         self.waste[waste_type] += amount
 
     def add_product(self, amount: float):
@@ -49,12 +46,47 @@ class MaterialsManager:
             "total_product_grams": self.product_produced
         }
 
+MATERIALS = MaterialsManager()
+
+class RandomStream:
+    """Uniform [0, 1) draws generated in blocks by NumPy and handed out one at a time.
+
+    The stream outlives a single run: an engine only reseeds it when given a
+    seed, so a sweep of many unseeded runs keeps drawing from the same blocks.
+    """
+    def __init__(self, block_size: int = 1024):
+        self.block_size = block_size
+        self.reset()
+
+    def reset(self, seed: Optional[int] = None, block_size: Optional[int] = None):
+        # For a sweep, size the block to all of its draws (runs x draws per run)
+        if block_size is not None:
+            self.block_size = block_size
+        self.rng = np.random.default_rng(seed)
+        self.draws = []  # Drawn on first use
+        self.cursor = 0
+
+    def random(self) -> float:
+        if self.cursor == len(self.draws):
+            # Kept as a list of floats: indexing it is cheaper than indexing an array
+            self.draws = self.rng.random(self.block_size).tolist()
+            self.cursor = 0
+        value = self.draws[self.cursor]
+        self.cursor += 1
+        return value
+
+RANDOM = RandomStream()
+
 class SimulationEngine:
     """Wrapper around simpy Environment."""
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.env = simpy.Environment()
-        self.materials_manager = MaterialsManager()
+        self.materials_manager = MATERIALS
         self.materials_manager.reset()
+        self.random = RANDOM
+        if seed is not None:
+            # Unseeded runs carry on from where the previous run left the stream
+            self.random.reset(seed)
         # registry of tanks / buffers
         self.tanks = {}
 
@@ -1,13 +1,15 @@
+import logging
+import sys
 import yaml
 import simpy
-from schema import RecipeConfig
+from schema import RecipeConfig, RECIPE_ADAPTER
 from engine import SimulationEngine, Batch
-from units import MediaPrep, Fermentation, Chromatography
+from units import build_steps, log as units_log
 
 def load_config(path: str) -> RecipeConfig:
     with open(path, 'r') as f:
         data = yaml.safe_load(f)
-    return RecipeConfig(**data)
+    return RECIPE_ADAPTER.validate_python(data)
 
 def run_simulation():
     try:
@@ -29,21 +31,12 @@ def run_simulation():
     
     print(f"Starting Simulation with Batch Size: {batch.volume_liters}L")
 
+    # Build the unit operations once, up front
+    steps = build_steps(config, engine.env, bioreactor, chromatography_skids)
+
     def process_flow():
-        for step_config in config.steps:
-            step_type = step_config.type
-            
-            if step_type == "MediaPrep":
-                step = MediaPrep(engine.env, step_config)
-                yield from step.run(batch)
-                
-            elif step_type == "Fermentation":
-                step = Fermentation(engine.env, step_config, resource=bioreactor)
-                yield from step.run(batch)
-                
-            elif step_type == "Chromatography":
-                step = Chromatography(engine.env, step_config, resource=chromatography_skids)
-                yield from step.run(batch)
+        for step in steps:
+            yield from step.run(batch)
             
             # Check if batch failed (volume 0)
             if batch.volume_liters == 0:
@@ -77,4 +70,7 @@ def run_simulation():
     print("="*30)
 
 if __name__ == "__main__":
+    # Show the step-by-step log from the unit operations alongside the report
+    units_log.addHandler(logging.StreamHandler(sys.stdout))
+    units_log.setLevel(logging.DEBUG)
     run_simulation()
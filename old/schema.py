@@ -1,11 +1,15 @@
+import yaml
 from typing import List, Dict, Optional, Literal, Union, Annotated
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 class ResourceConfig(BaseModel):
     bioreactor_volume: float = Field(..., description="Volume of the bioreactor in Liters")
     chromatography_skids: int = Field(..., description="Number of available chromatography skids")
 
 class StepConfig(BaseModel):
+    # Step settings are read-only once validated
+    model_config = ConfigDict(frozen=True)
+
     type: str
     name: str
     duration_hours: Optional[float] = None
@@ -31,3 +35,9 @@ StepUnion = Annotated[Union[FermentationConfig, ChromatographyConfig, MediaPrepC
 class RecipeConfig(BaseModel):
     resources: ResourceConfig
     steps: List[StepUnion]
+
+# Validator built once and reused for every recipe load
+RECIPE_ADAPTER = TypeAdapter(RecipeConfig)
+
+# libyaml's C loader when PyYAML was built with it, the pure-Python one otherwise
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
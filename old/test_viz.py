@@ -1,11 +1,11 @@
 import yaml
-from schema import RecipeConfig
+from schema import RECIPE_ADAPTER, YamlLoader
 from viz import render_process_map
 
 def test_viz():
     with open('process.yaml', 'r') as f:
-        data = yaml.safe_load(f)
-    config = RecipeConfig(**data)
+        data = yaml.load(f, Loader=YamlLoader)
+    config = RECIPE_ADAPTER.validate_python(data)
     
     print("Rendering Process Map...")
     nodes, edges, config_obj = render_process_map(config)
@@ -1,15 +1,24 @@
+import logging
 import simpy
-import random
-from typing import Generator, Optional
-from engine import Batch, MaterialsManager
-from schema import StepConfig, FermentationConfig, ChromatographyConfig, MediaPrepConfig
+from typing import Generator, List, Optional
+from engine import Batch, MATERIALS, RANDOM
+from schema import RecipeConfig, StepConfig, FermentationConfig, ChromatographyConfig, MediaPrepConfig
+
+# Step progress goes to this logger at DEBUG; messages are only formatted when it is enabled
+log = logging.getLogger(__name__)
 
 class UnitOperation:
     """Base class for all unit operations."""
+    __slots__ = ("env", "config", "materials", "random", "duration_hours", "consumables")
+
     def __init__(self, env: simpy.Environment, config: StepConfig):
         self.env = env
         self.config = config
-        self.materials = MaterialsManager()
+        self.materials = MATERIALS
+        self.random = RANDOM
+        # Config constants read on every run
+        self.duration_hours = config.duration_hours
+        self.consumables = config.consumables
 
     def run(self, batch: Batch) -> Generator:
         """
@@ -17,47 +26,53 @@ class UnitOperation:
         Must be a generator (yield env.timeout or resource.request).
         """
         # Default behavior: just wait for duration if specified
-        if self.config.duration_hours:
-            yield self.env.timeout(self.config.duration_hours)
+        if self.duration_hours:
+            yield self.env.timeout(self.duration_hours)
 
 class MediaPrep(UnitOperation):
+    __slots__ = ()
+
     def __init__(self, env: simpy.Environment, config: MediaPrepConfig):
         super().__init__(env, config)
 
     def run(self, batch: Batch) -> Generator:
-        print(f"[{self.env.now:.2f}] Starting MediaPrep: {self.config.name}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[%.2f] Starting MediaPrep: %s", self.env.now, self.config.name)
         
         # Consume materials
-        for material, amount in self.config.consumables.items():
-            self.materials.consume(material, amount)
+        self.materials.consume_bulk(self.consumables)
         
-        if self.config.duration_hours:
-            yield self.env.timeout(self.config.duration_hours)
+        if self.duration_hours:
+            yield self.env.timeout(self.duration_hours)
             
-        print(f"[{self.env.now:.2f}] Finished MediaPrep: {self.config.name}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[%.2f] Finished MediaPrep: %s", self.env.now, self.config.name)
 
 class Fermentation(UnitOperation):
+    __slots__ = ("resource",)
+
     def __init__(self, env: simpy.Environment, config: FermentationConfig, resource: simpy.Resource):
         super().__init__(env, config)
         self.resource = resource
 
     def run(self, batch: Batch) -> Generator:
-        print(f"[{self.env.now:.2f}] Requesting Bioreactor for {self.config.name}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[%.2f] Requesting Bioreactor for %s", self.env.now, self.config.name)
         
         with self.resource.request() as req:
             yield req
-            print(f"[{self.env.now:.2f}] Started Fermentation: {self.config.name}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("[%.2f] Started Fermentation: %s", self.env.now, self.config.name)
             
             # Consume materials
-            for material, amount in self.config.consumables.items():
-                self.materials.consume(material, amount)
+            self.materials.consume_bulk(self.consumables)
 
             # Process
-            yield self.env.timeout(self.config.duration_hours)
+            yield self.env.timeout(self.duration_hours)
 
             # Stochastic Failure
-            if random.random() < self.config.contamination_risk:
-                print(f"[{self.env.now:.2f}] FAILURE: Contamination in {self.config.name}")
+            if self.random.random() < self.config.contamination_risk:
+                log.warning("[%.2f] FAILURE: Contamination in %s", self.env.now, self.config.name)
                 self.materials.add_waste("Contaminated Batch", batch.volume_liters)
                 batch.volume_liters = 0
                 batch.product_mass_grams = 0
@@ -71,30 +86,33 @@ class Fermentation(UnitOperation):
             batch.product_mass_grams += produced_mass
             batch.log(f"Completed {self.config.name}, produced {produced_mass}g")
             
-            print(f"[{self.env.now:.2f}] Finished Fermentation: {self.config.name}. Produced {produced_mass}g product.")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("[%.2f] Finished Fermentation: %s. Produced %sg product.", self.env.now, self.config.name, produced_mass)
 
 class Chromatography(UnitOperation):
+    __slots__ = ("resource",)
+
     def __init__(self, env: simpy.Environment, config: ChromatographyConfig, resource: simpy.Resource):
         super().__init__(env, config)
         self.resource = resource
 
     def run(self, batch: Batch) -> Generator:
-        print(f"[{self.env.now:.2f}] Requesting Chromatography Skid for {self.config.name}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[%.2f] Requesting Chromatography Skid for %s", self.env.now, self.config.name)
         
         with self.resource.request() as req:
             yield req
-            print(f"[{self.env.now:.2f}] Started Chromatography: {self.config.name}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("[%.2f] Started Chromatography: %s", self.env.now, self.config.name)
 
             total_cycles = self.config.cycles
             cycle_time = self.config.cycle_time_hours
             
-            # Run cycles
-            for i in range(total_cycles):
-                yield self.env.timeout(cycle_time)
+            # Run cycles (nothing is observed between cycles, so wait them out in one go)
+            yield self.env.timeout(total_cycles * cycle_time)
             
             # Consumables (Total for step)
-            for material, amount in self.config.consumables.items():
-                self.materials.consume(material, amount)
+            self.materials.consume_bulk(self.consumables)
 
             # Yield loss
             original_mass = batch.product_mass_grams
@@ -105,12 +123,32 @@ class Chromatography(UnitOperation):
             self.materials.add_waste("Purification Waste", loss)
             
             batch.log(f"Completed {self.config.name}, yield {self.config.yield_step*100}%")
-            print(f"[{self.env.now:.2f}] Finished Chromatography: {self.config.name}. Yield: {self.config.yield_step*100}%. Final Mass: {final_mass:.2f}g")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("[%.2f] Finished Chromatography: %s. Yield: %s%%. Final Mass: %.2fg", self.env.now, self.config.name, self.config.yield_step*100, final_mass)
+
+
+def build_steps(config: RecipeConfig, env: simpy.Environment, bioreactor: simpy.Resource,
+                skids: simpy.Resource) -> List[UnitOperation]:
+    """Builds the unit operation for each configured step, in recipe order."""
+    steps = []
+    for step_config in config.steps:
+        step_type = step_config.type
+        if step_type == "MediaPrep":
+            steps.append(MediaPrep(env, step_config))
+        elif step_type == "Fermentation":
+            steps.append(Fermentation(env, step_config, resource=bioreactor))
+        elif step_type == "Chromatography":
+            steps.append(Chromatography(env, step_config, resource=skids))
+    return steps
 
 
 class PerfusionFermentation(UnitOperation):
+    # engine (for its tanks) is assigned by the caller after construction
+    __slots__ = ("engine",)
+
     def run(self, batch: Batch, output_tank_name: str):
-        print(f"[{self.env.now}] Start Perfusion")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[%s] Start Perfusion", self.env.now)
         
         output_tank = self.engine.tanks[output_tank_name]
         
@@ -125,13 +163,18 @@ class PerfusionFermentation(UnitOperation):
             amount_produced = 1.0 
             yield output_tank.put(amount_produced) 
             
-            print(f"[{self.env.now}] Bleed {amount_produced}L to {output_tank_name}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("[%s] Bleed %sL to %s", self.env.now, amount_produced, output_tank_name)
 
-        print(f"[{self.env.now}] Perfusion Complete")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[%s] Perfusion Complete", self.env.now)
 
         
 
 class PeriodicChromatography(UnitOperation):
+    # engine (for its tanks) is assigned by the caller after construction
+    __slots__ = ("engine",)
+
     def run(self, input_tank_name: str):
         input_tank = self.engine.tanks[input_tank_name]
         
@@ -143,7 +186,8 @@ class PeriodicChromatography(UnitOperation):
             volume_to_process = input_tank.level
             
             if volume_to_process > 0:
-                print(f"[{self.env.now}] Daily Chroma started. Processing {volume_to_process}L")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("[%s] Daily Chroma started. Processing %sL", self.env.now, volume_to_process)
                 
                 # CONSUME: Take liquid out of the tank
                 yield input_tank.get(volume_to_process)
@@ -151,6 +195,8 @@ class PeriodicChromatography(UnitOperation):
                 # Simulate processing time (e.g., 4 hours)
                 yield self.env.timeout(4)
                 
-                print(f"[{self.env.now}] Daily Chroma finished.")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("[%s] Daily Chroma finished.", self.env.now)
             else:
-                print(f"[{self.env.now}] Tank empty, skipping Chroma run.")
\ No newline at end of file
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("[%s] Tank empty, skipping Chroma run.", self.env.now)
\ No newline at end of file
@@ -1,67 +1,55 @@
-import networkx as nx
+from functools import lru_cache
 from streamlit_agraph import agraph, Node, Edge, Config
 from schema import RecipeConfig
 
-def build_graph(config: RecipeConfig) -> nx.DiGraph:
-    G = nx.DiGraph()
-    
-    # Add nodes
-    for step in config.steps:
-        G.add_node(step.name, type=step.type, duration=step.duration_hours)
-        
-    # Add edges
-    for step in config.steps:
-        if step.input_batch:
-            if step.input_batch in G.nodes:
-                G.add_edge(step.input_batch, step.name)
-            else:
-                pass
-                
-    return G
+NODE_COLORS = {
+    "Fermentation": "#90EE90",    # Light Green
+    "Chromatography": "#98FB98",  # Pale Green
+    "MediaPrep": "#ADD8E6",       # Light Blue
+}
+DEFAULT_COLOR = "#FFCCCB"  # Light Red
 
 def get_node_color(step_type: str):
-    if step_type == "Fermentation":
-        return "#90EE90" # Light Green
-    elif step_type == "Chromatography":
-        return "#98FB98" # Pale Green
-    elif step_type == "MediaPrep":
-        return "#ADD8E6" # Light Blue
-    else:
-        return "#FFCCCB" # Light Red
+    return NODE_COLORS.get(step_type, DEFAULT_COLOR)
+
+@lru_cache(maxsize=256)
+def _make_node(name: str, step_type: str, duration) -> Node:
+    # Re-renders of an unchanged recipe reuse the same Node objects
+    return Node(
+        id=name,
+        label=f"{name}\n({step_type})\n{duration}h",
+        size=25,
+        color=get_node_color(step_type),
+        shape="box"
+    )
+
+@lru_cache(maxsize=256)
+def _make_edge(source: str, target: str) -> Edge:
+    return Edge(
+        source=source,
+        target=target,
+        type="CURVE_SMOOTH"
+    )
 
 def render_process_map(config: RecipeConfig):
-    G = build_graph(config)
-    
-    # We can still use networkx layout if we want fixed positions, 
-    # but agraph handles layout automatically (physics based).
+    # agraph handles layout automatically (physics based).
     # However, user requested "Topological Sort" or "Generational Layout".
     # agraph supports 'hierarchical' layout via Config.
+    # Nodes and edges come straight from the recipe steps: no graph algorithm
+    # runs on them, so there is no intermediate networkx graph.
     
-    nodes = []
-    edges = []
+    # One node per step name: a repeated name keeps its first position and takes
+    # the last step's settings, as graph nodes keyed by name did
+    steps_by_name = {step.name: step for step in config.steps}
+    nodes = [_make_node(name, step.type, step.duration_hours) for name, step in steps_by_name.items()]
     
-    for node_name in G.nodes:
-        node_data = G.nodes[node_name]
-        step_type = node_data['type']
-        duration = node_data.get('duration', 0)
-        
-        label = f"{node_name}\n({step_type})\n{duration}h"
-        color = get_node_color(step_type)
-        
-        nodes.append(Node(
-            id=node_name,
-            label=label,
-            size=25,
-            color=color,
-            shape="box"
-        ))
-        
-    for u, v in G.edges:
-        edges.append(Edge(
-            source=u,
-            target=v,
-            type="CURVE_SMOOTH"
-        ))
+    # An edge only links to a step that exists in the recipe, and each link is drawn once
+    links = dict.fromkeys(
+        (step.input_batch, step.name)
+        for step in config.steps
+        if step.input_batch in steps_by_name
+    )
+    edges = [_make_edge(source, target) for source, target in links]
         
     config_obj = Config(
         width=800,
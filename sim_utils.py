@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional: without it the kernels below run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# --- DATA LOGGING ---
+
+class ColumnarLogger:
+    """Append-only table kept as one typed NumPy buffer per column.
+
+    Buffers double in size when full, and a DataFrame is only built once,
+    in to_df(), instead of being inferred from a list of row dicts.
+    """
+    def __init__(self, schema, capacity=1024):
+        capacity = max(capacity, 1)  # Doubling has to grow the buffers
+        self._bufs = {name: np.empty(capacity, dtype=dtype) for name, dtype in schema.items()}
+        self._n = 0
+        self._cap = capacity
+
+    def __len__(self):
+        return self._n
+
+    def append(self, **row):
+        if self._n == self._cap:
+            self._cap *= 2
+            for name, buf in self._bufs.items():
+                self._bufs[name] = np.resize(buf, self._cap)
+        i = self._n
+        for name, value in row.items():
+            self._bufs[name][i] = value
+        self._n = i + 1
+
+    def column(self, name):
+        """The filled part of one column (a view, not a copy)."""
+        return self._bufs[name][:self._n]
+
+    def to_df(self):
+        return pd.DataFrame({name: buf[:self._n] for name, buf in self._bufs.items()})
+
+
+# --- POST-PROCESSING KERNELS ---
+
+@njit(cache=True)
+def resample(transition_times, transition_levels, sample_times):
+    """Linearly interpolates recorded transitions onto sorted sample times.
+
+    Levels are held flat before the first and after the last transition. When
+    several transitions share a timestamp, the last one recorded wins.
+    """
+    n = transition_times.shape[0]
+    out = np.empty(sample_times.shape[0])
+    j = 0
+    for i in range(sample_times.shape[0]):
+        t = sample_times[i]
+        while j < n - 1 and transition_times[j + 1] <= t:
+            j += 1
+        if t <= transition_times[0] or j == n - 1:
+            out[i] = transition_levels[j]
+        else:
+            t0 = transition_times[j]
+            level0 = transition_levels[j]
+            slope = (transition_levels[j + 1] - level0) / (transition_times[j + 1] - t0)
+            out[i] = level0 + slope * (t - t0)
+    return out
+
+
+@njit(cache=True)
+def status_histogram(codes, n_codes):
+    """Counts how many samples fall in each status code (0 .. n_codes-1)."""
+    counts = np.zeros(n_codes, dtype=np.int64)
+    for i in range(codes.shape[0]):
+        counts[codes[i]] += 1
+    return counts
+
+
+@njit(cache=True)
+def lttb(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Always keeps the first and last point; in between, keeps the point of each
+    bucket that spans the largest triangle with the previously kept point and
+    the mean of the next bucket. Returns every index when n_out >= len(x).
+    """
+    n = x.shape[0]
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[n_out - 1] = n - 1
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best_area = area
+                best = j
+        keep[i + 1] = best
+        a = best
+    return keep
+
+
+@njit(cache=True)
+def minmax_buckets(y, n_out):
+    """Indices of the points kept when downsampling a step series to at most n_out points.
+
+    Splits the series into n_out // 4 buckets and keeps the first, lowest,
+    highest and last point of each, in time order. Drawn as steps, every
+    bucket reaches its true extremes and ends on its true level, which
+    LTTB (made for straight lines between points) does not guarantee.
+    Returns every index when n_out >= len(y).
+    """
+    n = y.shape[0]
+    n_buckets = n_out // 4
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+    keep = np.empty(4 * n_buckets, dtype=np.int64)
+    k = 0
+    for b in range(n_buckets):
+        start = b * n // n_buckets
+        end = (b + 1) * n // n_buckets
+        lo = start
+        hi = start
+        for j in range(start + 1, end):
+            if y[j] < y[lo]:
+                lo = j
+            if y[j] > y[hi]:
+                hi = j
+        for j in (start, min(lo, hi), max(lo, hi), end - 1):
+            if k == 0 or j > keep[k - 1]:
+                keep[k] = j
+                k += 1
+    return keep[:k]
+
+
+def steps_post(x, y, x_end):
+    """Vertices of a steps-post line: each y holds until the next x (the last one until x_end)."""
+    xs = np.repeat(np.append(x, x_end), 2)[1:-1]
+    ys = np.repeat(y, 2)
+    return np.column_stack([xs, ys])
+
+
+# --- MASS BALANCE KERNELS ---
+
+@njit(cache=True)
+def extract(masses, fraction):
+    """Removes `fraction` of every mass in place and returns the removed amounts."""
+    out = np.empty_like(masses)
+    for i in range(masses.shape[0]):
+        out[i] = masses[i] * fraction
+        masses[i] -= out[i]
+    return out
+
+
+# --- PRECOMPUTED SCHEDULES ---
+
+# Event log codes of simulate_perfusion: (time, code, tank, level) rows
+EVENT_START = 0     # Bioreactor started
+EVENT_SWITCH = 1    # Active tank ran low: tank is the old one, level is the new one's
+EVENT_ALARM = 2     # Both tanks empty, no draw this hour
+EVENT_MEDIA = 3     # Empty idle tank: clean & refill started
+EVENT_REFILLED = 4  # Refill landed: level is the tank's level after it
+
+# SimPy orders its event queue by (time, priority, event id); a process start is
+# URGENT, everything else NORMAL. Priority and id are packed into one integer
+_NORMAL = 1 << 40
+
+
+@njit(cache=True)
+def _schedule(wake_time, wake_order, proc, time, eid):
+    """Queues the next event of process `proc` and returns the next event id."""
+    wake_time[proc] = time
+    wake_order[proc] = _NORMAL + eid
+    return eid + 1
+
+
+@njit(cache=True)
+def _log_event(events, n_events, time, code, tank, level):
+    """Appends one row to the event log, doubling it when full."""
+    if n_events == events.shape[0]:
+        events = np.concatenate((events, np.empty_like(events)))
+    events[n_events, 0] = time
+    events[n_events, 1] = code
+    events[n_events, 2] = tank
+    events[n_events, 3] = level
+    return events
+
+
+@njit(cache=True)
+def simulate_perfusion(capacity, flow, clean_time, fill_time, duration,
+                       product_capacity=1000.0, waste_capacity=10000.0, report_interval=1.0):
+    """Runs the swing-tank processes of 02-sim_dual_media.py as one loop.
+
+    The bioreactor, media manager and reporter are kept as resumable steps
+    and their events are replayed in SimPy's queue order, with the
+    simpy.Container rules for puts and gets: a refill that does not fit
+    waits until a draw on that tank, and a full product or waste tank
+    stalls the bioreactor for good. Returns the reporter's samples
+    (times, mt1, mt2, product, waste, active) and the event log as an
+    (n, 4) array of (time, EVENT_* code, tank, level) rows.
+    """
+    # One sample per reporter tick before the end of the run
+    n = 0
+    tick = 0.0
+    while tick < duration:
+        n += 1
+        tick += report_interval
+    times = np.empty(n)
+    mt1 = np.empty(n)
+    mt2 = np.empty(n)
+    product = np.empty(n)
+    waste = np.empty(n)
+    active_log = np.empty(n, dtype=np.int8)
+    events = np.empty((64, 4))
+    n_events = 0
+
+    levels = np.array([capacity, 0.0])  # MT1 starts full, MT2 starts empty
+    active = 0
+    product_vol = 0.0
+    waste_vol = 0.0
+    to_product = flow * 0.05
+    to_waste = flow * 0.95
+
+    # Pending event of each process (0: bioreactor, 1: media manager, 2: reporter);
+    # all three start at t=0 in that order. A process blocked on a put has none
+    wake_time = np.zeros(3)
+    wake_order = np.arange(3)
+    eid = 3
+
+    # Where each process resumes, as the yield it is waiting on
+    bio_step = 0      # 0: start, 1: hourly timeout, 2: get, 3: product put, 4: waste put
+    get_tank = 0      # Tank of the bioreactor's pending get
+    media_step = 0    # 0: start/poll timeout, 1: cleaning, 2: filling, 3: refill put
+    media_tank = 0    # Tank being cleaned/refilled
+    media_blocked = False  # Refill put waiting for room in media_tank
+    sample = 0
+
+    while True:
+        # Next event in SimPy's queue order; the run ends at `duration`
+        proc = 0
+        for p in range(1, 3):
+            if wake_time[p] < wake_time[proc] or (wake_time[p] == wake_time[proc]
+                                                  and wake_order[p] < wake_order[proc]):
+                proc = p
+        now = wake_time[proc]
+        if now >= duration:
+            break
+
+        if proc == 0:
+            # --- Bioreactor ---
+            if bio_step == 0:
+                events = _log_event(events, n_events, now, EVENT_START, active, levels[active])
+                n_events += 1
+            elif bio_step == 1:
+                if levels[active] >= flow:
+                    # The get fits, so it is applied at once and processed next
+                    levels[active] -= flow
+                    get_tank = active
+                    eid = _schedule(wake_time, wake_order, 0, now, eid)
+                    bio_step = 2
+                    continue
+                events = _log_event(events, n_events, now, EVENT_ALARM, active, levels[active])
+                n_events += 1
+            elif bio_step == 2:
+                # Processing the get first retries a refill put waiting on that tank
+                if media_blocked and media_tank == get_tank and capacity - levels[get_tank] >= capacity:
+                    levels[get_tank] += capacity
+                    media_blocked = False
+                    eid = _schedule(wake_time, wake_order, 1, now, eid)
+                if product_capacity - product_vol >= to_product:
+                    product_vol += to_product
+                    eid = _schedule(wake_time, wake_order, 0, now, eid)
+                    bio_step = 3
+                else:
+                    wake_time[0] = np.inf  # Nothing ever drains the product tank
+                continue
+            elif bio_step == 3:
+                if waste_capacity - waste_vol >= to_waste:
+                    waste_vol += to_waste
+                    eid = _schedule(wake_time, wake_order, 0, now, eid)
+                    bio_step = 4
+                else:
+                    wake_time[0] = np.inf  # Nothing ever drains the waste tank
+                continue
+
+            # Top of the hourly loop: switch tanks if needed, then wait the hour
+            if levels[active] < flow:
+                events = _log_event(events, n_events, now, EVENT_SWITCH, active, levels[1 - active])
+                n_events += 1
+                active = 1 - active
+            eid = _schedule(wake_time, wake_order, 0, now + 1, eid)
+            bio_step = 1
+
+        elif proc == 1:
+            # --- Media manager ---
+            if media_step == 1:
+                eid = _schedule(wake_time, wake_order, 1, now + fill_time, eid)
+                media_step = 2
+                continue
+            if media_step == 2:
+                if capacity - levels[media_tank] >= capacity:
+                    levels[media_tank] += capacity
+                    eid = _schedule(wake_time, wake_order, 1, now, eid)
+                else:
+                    media_blocked = True
+                    wake_time[1] = np.inf
+                media_step = 3
+                continue
+
+            # Scan the tanks (picking up after the refilled one), then poll again in 0.1h
+            first = 0
+            if media_step == 3:
+                events = _log_event(events, n_events, now, EVENT_REFILLED, media_tank, levels[media_tank])
+                n_events += 1
+                first = media_tank + 1
+            media_step = 0
+            for tank in range(first, 2):
+                if tank != active and levels[tank] < 1.0:
+                    events = _log_event(events, n_events, now, EVENT_MEDIA, tank, levels[tank])
+                    n_events += 1
+                    media_tank = tank
+                    eid = _schedule(wake_time, wake_order, 1, now + clean_time, eid)
+                    media_step = 1
+                    break
+            if media_step == 0:
+                eid = _schedule(wake_time, wake_order, 1, now + 0.1, eid)
+
+        else:
+            # --- Reporter ---
+            times[sample] = now
+            mt1[sample] = levels[0]
+            mt2[sample] = levels[1]
+            product[sample] = product_vol
+            waste[sample] = waste_vol
+            active_log[sample] = active
+            sample += 1
+            eid = _schedule(wake_time, wake_order, 2, now + report_interval, eid)
+
+    return (times, mt1, mt2, product, waste, active_log), events[:n_events]
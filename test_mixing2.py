@@ -1,20 +1,58 @@
+import logging
+import sys
 import simpy
-from collections import Counter
+import numpy as np
 from dataclasses import dataclass, field
-from typing import Dict
+from typing import ClassVar, Dict, List
+from sim_utils import extract
 
-@dataclass
+# Tank transfers are logged at DEBUG; a Liquid is only formatted (repr) when that is enabled
+log = logging.getLogger(__name__)
+
+# Every substance a tank can hold, and its slot in the tank's mass array
+SUBSTANCES = ["Water", "Glucose", "Salt"]
+SUBSTANCE_IDX = {name: i for i, name in enumerate(SUBSTANCES)}
+
+def substance_id(name):
+    """Slot of a substance in the mass arrays, registering it on first use."""
+    idx = SUBSTANCE_IDX.get(name)
+    if idx is None:
+        idx = SUBSTANCE_IDX[name] = len(SUBSTANCES)
+        SUBSTANCES.append(name)
+    return idx
+
+@dataclass(slots=True)
 class Liquid:
     volume: float  # Liters
     # Composition: {'Water': 900g, 'Glucose': 50g, 'Salt': 10g}
     contents: Dict[str, float] = field(default_factory=dict)
 
+    # Released transient liquids, handed out again by acquire()
+    _pool: ClassVar[List["Liquid"]] = []
+
+    @classmethod
+    def acquire(cls, volume, contents):
+        """A Liquid for a transient transfer, reusing a released one when available."""
+        if cls._pool:
+            liquid = cls._pool.pop()
+            liquid.volume = volume
+            liquid.contents = contents
+            return liquid
+        return cls(volume=volume, contents=contents)
+
+    def release(self):
+        """Returns this Liquid to the pool; it must not be used afterwards."""
+        self.contents = {}
+        Liquid._pool.append(self)
+
     def __repr__(self):
         # Pretty print for debugging
         s = [f"{k}: {v:.2f}g" for k, v in self.contents.items()]
         return f"<Liquid {self.volume:.2f}L | {', '.join(s)}>"
 
 class AdvancedTank:
+    __slots__ = ("env", "name", "state", "container", "_masses", "_conc", "_dirty")
+
     def __init__(self, env, name, capacity):
         self.env = env
         self.name = name
@@ -31,31 +69,64 @@ class AdvancedTank:
         self.container = simpy.Container(env, capacity=capacity, init=0)
         
         # 3. CHEMISTRY ENGINE (Mass Balance)
-        # Tracks total grams of each substance in the tank
-        self._inventory = Counter() 
+        # Tracks total grams of each substance in the tank, indexed by SUBSTANCE_IDX
+        self._masses = np.zeros(len(SUBSTANCES), dtype=np.float64)
+
+        # g/L of every substance, recomputed only after a put/get changed the tank
+        self._conc = np.zeros(len(SUBSTANCES), dtype=np.float64)
+        self._dirty = False
 
     @property
     def current_volume(self):
         return self.container.level
 
+    def _grow(self):
+        """Pads the per-substance arrays for substances registered since they were sized."""
+        missing = len(SUBSTANCES) - len(self._masses)
+        if missing > 0:
+            self._masses = np.concatenate([self._masses, np.zeros(missing)])
+            self._conc = np.concatenate([self._conc, np.zeros(missing)])
+
+    def get_mass(self, substance):
+        """Returns grams of a specific substance in the tank."""
+        idx = SUBSTANCE_IDX.get(substance)
+        if idx is None or idx >= len(self._masses): return 0.0
+        return self._masses[idx]
+
+    @property
+    def concentrations(self):
+        """g/L of every substance, indexed by SUBSTANCE_IDX."""
+        if self._dirty:
+            if self.current_volume == 0:
+                self._conc[:] = 0.0
+            else:
+                np.divide(self._masses, self.current_volume, out=self._conc)
+            self._dirty = False
+        return self._conc
+
     def get_concentration(self, substance):
         """Returns g/L of a specific substance."""
-        if self.current_volume == 0: return 0.0
-        return self._inventory[substance] / self.current_volume
+        idx = SUBSTANCE_IDX.get(substance)
+        if idx is None or idx >= len(self._masses): return 0.0
+        return self.concentrations[idx]
 
     def put_liquid(self, liquid: Liquid):
         """
         Add a 'Liquid' object to the tank. 
         Mixes it perfectly with existing contents.
         """
-        print(f"[{self.env.now:5.2f}] {self.name}: Adding {liquid}")
+        log.debug("[%5.2f] %s: Adding %r", self.env.now, self.name, liquid)
+        # Resolve substance slots first, so new names are registered before anything changes
+        slots = [(substance_id(substance), mass) for substance, mass in liquid.contents.items()]
         
         # 1. Blocking Logic: Wait for space (Volume)
         yield self.container.put(liquid.volume)
         
         # 2. Mass Balance Logic: Add ingredients
-        for substance, mass in liquid.contents.items():
-            self._inventory[substance] += mass
+        self._grow()
+        for idx, mass in slots:
+            self._masses[idx] += mass
+        self._dirty = True
             
         # Update state example
         self.state["op_mode"] = "Filling"
@@ -74,18 +145,15 @@ class AdvancedTank:
         total_vol_before = self.container.level + volume_needed
         fraction = volume_needed / total_vol_before
         
-        extracted_contents = {}
+        # One compiled pass over all substances, also updating internal inventory
+        extracted = extract(self._masses, fraction)
+        self._dirty = True
         
-        for substance, total_mass in self._inventory.items():
-            mass_removed = total_mass * fraction
-            extracted_contents[substance] = mass_removed
-            
-            # Update internal inventory
-            self._inventory[substance] -= mass_removed
+        extracted_contents = {SUBSTANCES[i]: extracted[i] for i in np.flatnonzero(extracted > 0)}
             
         self.state["op_mode"] = "Emptying"
         
-        return Liquid(volume=volume_needed, contents=extracted_contents)
+        return Liquid.acquire(volume_needed, extracted_contents)
 
 def lab_process(env, tank):
     # --- STEP 1: CREATE CONCENTRATE ---
@@ -126,9 +194,13 @@ def lab_process(env, tank):
     # Validate the physics
     # We took 2L out of 20L (10%). We should have 10% of the glucose (100g).
     print(f"Sample Glucose Mass: {sample.contents['Glucose']:.2f}g (Expected 100g)")
-    print(f"Tank Remaining Glucose: {tank._inventory['Glucose']:.2f}g (Expected 900g)")
+    print(f"Tank Remaining Glucose: {tank.get_mass('Glucose'):.2f}g (Expected 900g)")
+    sample.release()
 
 # --- EXECUTION ---
+# Show the transfer log on the console (only this module's, not every library's DEBUG output)
+log.addHandler(logging.StreamHandler(sys.stdout))
+log.setLevel(logging.DEBUG)
 env = simpy.Environment()
 smart_tank = AdvancedTank(env, "Bioreactor", capacity=100)
 
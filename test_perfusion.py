@@ -1,28 +1,84 @@
+import math
 import simpy
 
+# Pure-Python (SimPy only), so it also runs unchanged under PyPy: `pypy3 test_perfusion.py`
+DEBUG = False  # Print the daily fermentation status lines (I/O kept out of the hourly loop otherwise)
+
+FERMENTATION_HOURS = 240  # 10 days
+DRIP_VOLUME = 2.0         # Liters bled into the harvest tank every hour
+
+
+class SimpleTank:
+    """
+    Harvest tank shared by one producer and one consumer.
+    Nobody ever waits on it, so it is a plain level counter rather than a
+    simpy.Container: put/get take effect immediately and schedule no events.
+    """
+    __slots__ = ("capacity", "level", "drip_start", "drip_settled")
+
+    def __init__(self, capacity, init=0.0):
+        self.capacity = capacity
+        self.level = init
+        self.drip_start = None   # Set when fermentation starts
+        self.drip_settled = 0.0  # Drip volume already put in the tank
+
+    def put(self, amount):
+        assert self.level + amount <= self.capacity, "Harvest tank overflow"
+        self.level += amount
+
+    def get(self, amount):
+        self.level -= amount
+
+
+def dripped_volume(harvest_tank, t, inclusive=False):
+    """
+    Volume the fermenter has bled into the tank by time t.
+    Drips land every hour after the start; one landing exactly at t only
+    counts when inclusive (a reader waking at t sees the tank before it).
+    """
+    if harvest_tank.drip_start is None:
+        return 0.0
+    elapsed = t - harvest_tank.drip_start
+    hours = math.floor(elapsed) if inclusive else math.ceil(elapsed) - 1
+    return min(max(hours, 0), FERMENTATION_HOURS) * DRIP_VOLUME
+
+
+def level_at(harvest_tank, t, inclusive=False):
+    """Tank level at time t, counting drips that have not been put in the tank yet."""
+    return harvest_tank.level + dripped_volume(harvest_tank, t, inclusive) - harvest_tank.drip_settled
+
+
+def settle_drip(env, harvest_tank, inclusive=False):
+    """Puts every drip that landed since the last settle into the tank in one go."""
+    pending = dripped_volume(harvest_tank, env.now, inclusive) - harvest_tank.drip_settled
+    if pending > 0:
+        harvest_tank.drip_settled += pending
+        harvest_tank.put(pending)
+
+
 def perfusion_fermentation(env, harvest_tank):
     """
     PRODUCER: Runs for 10 days. 
     Every 1 hour, it drips 2 Liters into the harvest tank.
+    The hourly drips are not scheduled one by one: the tank level is
+    derived from the start time (level_at) and put in bulk when read.
     """
     print(f"[{env.now:6.2f}] START: Fermentation started.")
+    harvest_tank.drip_start = env.now
     
-    # Run for 240 hours (10 days)
-    for i in range(240):
-        # 1. Wait for 1 hour to pass
-        yield env.timeout(1)
-        
-        # 2. Generate Product (2 Liters)
-        amount_produced = 2.0
-        
-        # 3. Put it in the tank
-        # This line effectively adds liquid to the container
-        yield harvest_tank.put(amount_produced)
+    # Wake once a day instead of every hour
+    for day in range(FERMENTATION_HOURS // 24):
+        yield env.timeout(24)
+        # Let the skid's wake-up at the same hour go first, as it did before the
+        # hourly drip (its timer was set earlier, so it ran ahead of that drip)
+        yield env.timeout(0)
         
         # (Optional) Print status every 24 hours so we don't spam the console
-        if env.now % 24 == 0:
-            print(f"[{env.now:6.2f}] FERM : Bleeding {amount_produced}L. Tank Level: {harvest_tank.level}L")
+        if DEBUG:
+            print(f"[{env.now:6.2f}] FERM : Bleeding {DRIP_VOLUME}L. Tank Level: {level_at(harvest_tank, env.now, inclusive=True)}L")
 
+    # Hand over whatever is still pending, including the final drip
+    settle_drip(env, harvest_tank, inclusive=True)
     print(f"[{env.now:6.2f}] END  : Fermentation finished.")
 
 
@@ -38,13 +94,14 @@ def daily_chromatography(env, harvest_tank):
         yield env.timeout(24)
         
         # 2. Check how much is in the tank right now
-        current_vol = harvest_tank.level
+        current_vol = level_at(harvest_tank, env.now)
         
         if current_vol > 0:
             print(f"[{env.now:6.2f}] CHROMA: Waking up. Found {current_vol}L in tank.")
             
             # 3. Take the liquid OUT of the tank (simulating loading)
-            yield harvest_tank.get(current_vol)
+            settle_drip(env, harvest_tank)
+            harvest_tank.get(current_vol)
             
             # 4. Simulate the time it takes to run the column (e.g., 4 hours)
             processing_time = 4
@@ -62,7 +119,7 @@ env = simpy.Environment()
 
 # 2. Create the Shared Tank (The Buffer)
 # capacity=1000 means it overflows if we put more than 1000L
-harvest_tank = simpy.Container(env, capacity=1000, init=0)
+harvest_tank = SimpleTank(capacity=1000, init=0)
 
 # 3. "Hire the workers" (Register the processes)
 # We tell SimPy to run these two functions IN PARALLEL
@@ -0,0 +1,97 @@
+import contextlib
+import importlib.util
+import io
+import itertools
+from pathlib import Path
+
+import numpy as np
+
+from sim_utils import ColumnarLogger, minmax_buckets
+
+# The perfusion script, imported as a module (its run and chart sit behind a __main__ guard)
+_spec = importlib.util.spec_from_file_location("sim_dual_media", Path(__file__).parent / "02-sim_dual_media.py")
+sim_dual_media = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sim_dual_media)
+
+
+def run_both(capacity, flow, clean_time, fill_time, duration, product_capacity, waste_capacity):
+    """Runs the SimPy processes and simulate_perfusion on one configuration: ((df, printed log), ...) each."""
+    model = sim_dual_media
+    model.TANK_CAPACITY, model.BIOREACTOR_FLOW = capacity, flow
+    model.CLEANING_TIME, model.FILLING_TIME = clean_time, fill_time
+    model.SIM_DURATION = duration
+    model.PRODUCT_CAPACITY, model.WASTE_CAPACITY = product_capacity, waste_capacity
+
+    results = []
+    for run in (model.run_simpy, model.run_kernel):
+        model.State.active = "MT1"
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            df = run()
+        results.append((df.set_index("Time"), out.getvalue()))
+    return results
+
+
+def check_matches_simpy(params):
+    (expected, expected_log), (got, got_log) = run_both(*params)
+
+    # The reporter skips rows when nothing changed; each row holds until the next one
+    expected = expected.reindex(got.index, method="ffill")
+    for column in ["MT1_Level", "MT2_Level", "Product_Vol", "Waste_Vol", "Active_Tank"]:
+        np.testing.assert_array_equal(got[column].to_numpy(), expected[column].to_numpy(),
+                                      err_msg=f"{column} for {params}")
+    assert got_log == expected_log, f"event log for {params}"
+
+
+def test_simulate_perfusion_matches_simpy():
+    cases = itertools.product(
+        [10.0, 100.0],           # tank capacity (10L with 0.7L/h leaves residue a refill can't fit on)
+        [0.7, 2.0, 3.3, 12.0],   # bioreactor flow (12L/h is more than a 10L tank holds)
+        [(4.0, 2.0), (0.5, 1.25), (4.0, 1.0), (1.0, 1.0), (2.0, 2.0), (1.0, 3.0)],  # cleaning, filling time
+        [(1000, 10000), (5, 60), (3, 1000)],  # product, waste capacity (small ones stall the bioreactor)
+    )
+    for capacity, flow, (clean_time, fill_time), (product_capacity, waste_capacity) in cases:
+        check_matches_simpy((capacity, flow, clean_time, fill_time, 200, product_capacity, waste_capacity))
+
+
+def test_simulate_perfusion_matches_simpy_random():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        check_matches_simpy((
+            float(rng.choice([5.0, 10.0, 100.0])),
+            float(rng.choice([0.5, 0.7, 1.0, 2.0, 3.3, 6.0])),
+            float(rng.choice([0.5, 1.0, 2.0, 4.0])),
+            float(rng.choice([0.5, 1.0, 1.25, 2.0, 3.0])),
+            int(rng.choice([100, 300, 700])),
+            int(rng.choice([3, 20, 1000])),
+            int(rng.choice([40, 200, 10000])),
+        ))
+
+
+def test_minmax_buckets_keeps_bucket_extremes():
+    rng = np.random.default_rng(1)
+    y = np.repeat(rng.random(500), rng.integers(1, 20, 500))  # A step series
+    keep = minmax_buckets(y, 100)
+    assert len(keep) <= 100 and np.all(np.diff(keep) > 0)
+    for b in range(25):
+        start, end = b * len(y) // 25, (b + 1) * len(y) // 25
+        kept = keep[(keep >= start) & (keep < end)]
+        assert kept[0] == start and kept[-1] == end - 1
+        assert y[kept].min() == y[start:end].min() and y[kept].max() == y[start:end].max()
+    np.testing.assert_array_equal(minmax_buckets(y[:50], 100), np.arange(50))
+
+
+def test_columnar_logger_grows_from_zero_capacity():
+    log = ColumnarLogger({"Time": np.float64, "Level": np.float32}, capacity=0)
+    for i in range(5):
+        log.append(Time=i, Level=2 * i)
+    assert len(log) == 5
+    np.testing.assert_array_equal(log.column("Level"), [0, 2, 4, 6, 8])
+
+
+if __name__ == "__main__":
+    test_simulate_perfusion_matches_simpy()
+    test_simulate_perfusion_matches_simpy_random()
+    test_minmax_buckets_keeps_bucket_extremes()
+    test_columnar_logger_grows_from_zero_capacity()
+    print("Test Passed!")